@@ -7,29 +7,41 @@
 # - Embedded Cheatsheet inside Settings (no separate menu)
 # - Expanded Help with full user guide
 # - First-run setup guide popup when no config file exists
-# - LLM-assisted strict filename "already-formatted" check
+# - Local strict filename "already-formatted" check (optional LLM fallback)
 # - Duplicate-content detection (hash) and safe renaming
+# - Batched metadata requests (several PDFs per Gemini call)
 # - App/window icon support (dev + PyInstaller onefile)
 
 import os
 import io
+import asyncio
 import sys
 import logging
 import json
 import threading
+import queue
+import collections
+import concurrent.futures
+import multiprocessing
 import hashlib
 import configparser
+import dataclasses
+import sqlite3
 import re
+import string
+import functools
+import itertools
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, ttk
 from tkinter import PhotoImage
 
+import pymupdf  # pip install pymupdf
 from dotenv import load_dotenv
-from PyPDF2 import PdfReader, PdfWriter
 
 # Google AI Studio SDK (pip install google-genai)
 from google import genai
 from google.genai import types
+import httpx  # installed with google-genai
 
 # Branding
 APP_NAME = "PaperDF"  # Paper Document Formatter
@@ -56,7 +68,7 @@ def show_about_dialog(parent=None):
     info = (
         f"{APP_NAME}\n"
         f"Version: {APP_VERSION}\n"
-        f"Default Model: {MODEL_NAME}\n"
+        f"Default Model: {SETTINGS.model}\n"
         f"Config Path: {CONFIG_PATH}\n"
         f"ENV Path: {ENV_PATH}\n"
         f"Store Dir: {STORE_DIR}\n"
@@ -74,6 +86,30 @@ except Exception:
     def titlecase(s: str) -> str:
         return s.title() if isinstance(s, str) else s
 
+@functools.lru_cache(maxsize=4096)
+def _tc(s: str) -> str:
+    """Memoized titlecase: journals and surnames repeat heavily across a batch."""
+    return titlecase(s) if isinstance(s, str) else s
+
+# Optional: BLAKE3 (SIMD) content hashing; SHA-256 uses SHA-NI via OpenSSL otherwise
+try:
+    from blake3 import blake3 as _content_hasher  # pip install blake3
+except Exception:
+    _content_hasher = hashlib.sha256
+
+# Optional: orjson for faster parsing of model responses
+try:
+    from orjson import loads as _json_loads  # pip install orjson
+except Exception:
+    _json_loads = json.loads
+
+# Optional: HTTP/2 for the Gemini connection pool (httpx needs the h2 package for it)
+try:
+    import h2  # noqa: F401  pip install h2
+    _HTTP2_AVAILABLE = True
+except Exception:
+    _HTTP2_AVAILABLE = False
+
 # =========================
 # Storage locations
 # =========================
@@ -87,6 +123,8 @@ STORE_DIR = os.path.join(LOCALAPPDATA_DIR, ENV_SUBDIR)
 os.makedirs(STORE_DIR, exist_ok=True)
 ENV_PATH = os.path.join(STORE_DIR, ENV_FILENAME)
 CONFIG_PATH = os.path.join(STORE_DIR, CONFIG_FILENAME)
+HASH_CACHE_PATH = os.path.join(STORE_DIR, 'hash_cache.sqlite')
+PROCESSED_DB_PATH = os.path.join(STORE_DIR, 'processed.sqlite')
 
 # Load environment variables if present
 if os.path.exists(ENV_PATH):
@@ -95,11 +133,10 @@ if os.path.exists(ENV_PATH):
 # =========================
 # Defaults & constants
 # =========================
-API_KEY = os.getenv('GEMINI_API_KEY', '')
 DEFAULT_MODEL = 'gemini-2.5-flash-lite'   # default model
-MODEL_NAME = DEFAULT_MODEL
 
 INVALID_FILENAME_CHARS = '<>:"/\\|?*'
+_INVALID_TRANS = str.maketrans('', '', INVALID_FILENAME_CHARS)
 DEFAULT_OUTPUT_PATTERN = '{journal} - {year} - {authors} - {title}.pdf'
 # Default book template as requested
 DEFAULT_BOOK_OUTPUT_PATTERN = '{authors} - {title} - {journal} ({year}).pdf'
@@ -107,6 +144,26 @@ DEFAULT_UNPUBLISHED = 'Unpublished'
 DEFAULT_PAPER_PAGES = 4
 DEFAULT_BOOK_PAGES = 20
 MAX_PAGES_TO_EXTRACT = 50
+REQUEST_TIMEOUT_MS = 60_000
+HTTP_POOL_SIZE = 32  # keep-alive connections shared by all workers
+# Rate limits (429) and transient server errors are retried with exponential backoff and jitter
+REQUEST_RETRY = types.HttpRetryOptions(
+    attempts=6,
+    initial_delay=2.0,
+    max_delay=60.0,
+    exp_base=2.0,
+    http_status_codes=[408, 429, 500, 502, 503, 504],
+)
+LOG_FLUSH_MS = 100         # how often queued log lines are written to the widget
+LOG_MAX_LINES = 2000       # older lines are dropped so long runs keep the Text widget small
+PDF_EXTS = ('.pdf', '.PDF', '.Pdf', '.pDF', '.PDf', '.pdF', '.PdF', '.pDf')  # every casing, so no lowercased copy
+SCAN_QUEUE_SIZE = 64       # discovered paths buffered ahead of the workers
+ABORT_POLL_S = 0.2         # how often the run loop checks for Abort while batches are running
+SUBMIT_WINDOW_FILES = 256  # files submitted to the workers but not yet renamed
+MANIFEST_COMMIT_EVERY = 100 # processed-file records written per transaction
+DEFAULT_BATCH_SIZE = 4  # PDFs sent per Gemini request
+DEFAULT_MAX_WORKERS = 8  # batches prepared concurrently
+DEFAULT_ASYNC_CONCURRENCY = 5  # batches in flight on the asyncio path
 
 # Author format defaults
 DEFAULT_AUTHOR_FMT_PAPER = '{surname}'
@@ -118,80 +175,266 @@ FIRST_RUN = not os.path.exists(CONFIG_PATH)
 # =========================
 # Load or initialize config
 # =========================
+@dataclasses.dataclass(frozen=True, slots=True)
+class Settings:
+    """User settings. Immutable: a save swaps in a new instance, so a running batch keeps a consistent view."""
+    output_pattern: str = DEFAULT_OUTPUT_PATTERN
+    book_output_pattern: str = DEFAULT_BOOK_OUTPUT_PATTERN
+    unpublished: str = DEFAULT_UNPUBLISHED
+    api_key: str = ''
+    model: str = DEFAULT_MODEL
+    author_format_paper: str = DEFAULT_AUTHOR_FMT_PAPER
+    author_format_book: str = DEFAULT_AUTHOR_FMT_BOOK
+    batch_size: int = DEFAULT_BATCH_SIZE
+    max_workers: int = DEFAULT_MAX_WORKERS
+    llm_format_check: bool = False
+    async_requests: bool = False
+    async_concurrency: int = DEFAULT_ASYNC_CONCURRENCY
+
+    @classmethod
+    def from_section(cls, section) -> 'Settings':
+        def read(getter, key, default):
+            try:
+                return getter(key, default)
+            except ValueError:
+                return default
+        return cls(
+            output_pattern=section.get('output_pattern', DEFAULT_OUTPUT_PATTERN),
+            book_output_pattern=section.get('book_output_pattern', DEFAULT_BOOK_OUTPUT_PATTERN),
+            unpublished=section.get('unpublished', DEFAULT_UNPUBLISHED),
+            api_key=section.get('api_key', os.getenv('GEMINI_API_KEY', '')),
+            model=section.get('model', DEFAULT_MODEL),
+            author_format_paper=section.get('author_format_paper', DEFAULT_AUTHOR_FMT_PAPER),
+            author_format_book=section.get('author_format_book', DEFAULT_AUTHOR_FMT_BOOK),
+            batch_size=max(1, read(section.getint, 'batch_size', DEFAULT_BATCH_SIZE)),
+            max_workers=max(1, read(section.getint, 'max_workers', DEFAULT_MAX_WORKERS)),
+            llm_format_check=read(section.getboolean, 'llm_format_check', False),
+            async_requests=read(section.getboolean, 'async_requests', False),
+            async_concurrency=max(1, read(section.getint, 'async_concurrency', DEFAULT_ASYNC_CONCURRENCY)),
+        )
+
+    def to_section(self) -> dict:
+        return {
+            'output_pattern': self.output_pattern,
+            'book_output_pattern': self.book_output_pattern,
+            'unpublished': self.unpublished,
+            'api_key': self.api_key,
+            'model': self.model,
+            'author_format_paper': self.author_format_paper,
+            'author_format_book': self.author_format_book,
+            'batch_size': str(self.batch_size),
+            'max_workers': str(self.max_workers),
+            'llm_format_check': str(self.llm_format_check).lower(),
+            'async_requests': str(self.async_requests).lower(),
+            'async_concurrency': str(self.async_concurrency),
+        }
+
+    def output_pattern_for(self, is_book: bool) -> str:
+        return self.book_output_pattern if is_book else self.output_pattern
+
+    def author_format_for(self, is_book: bool) -> str:
+        return self.author_format_book if is_book else self.author_format_paper
+
 config = configparser.ConfigParser()
 if os.path.exists(CONFIG_PATH):
     config.read(CONFIG_PATH)
 if 'Settings' not in config:
     config['Settings'] = {}
-settings = config['Settings']
-
-OUTPUT_PATTERN = settings.get('output_pattern', DEFAULT_OUTPUT_PATTERN)
-BOOK_OUTPUT_PATTERN = settings.get('book_output_pattern', DEFAULT_BOOK_OUTPUT_PATTERN)
-UNPUBLISHED_PLACEHOLDER = settings.get('unpublished', DEFAULT_UNPUBLISHED)
-API_KEY = settings.get('api_key', API_KEY)
-MODEL_NAME = settings.get('model', MODEL_NAME)
-
-# Separate author formats
-AUTHOR_FMT_PAPER = settings.get('author_format_paper', DEFAULT_AUTHOR_FMT_PAPER)
-AUTHOR_FMT_BOOK = settings.get('author_format_book', DEFAULT_AUTHOR_FMT_BOOK)
+SETTINGS = Settings.from_section(config['Settings'])
 
 # Globals
 client = None
+_client_api_key = None
+_client_lock = threading.Lock()
+_async_loop = None
+_extraction_pool = None
+_pymupdf_lock = threading.Lock()  # PyMuPDF does not support concurrent use from several threads
+current_executor = None  # the running batch's thread pool, so Abort can cancel its queue
+log_queue = queue.Queue()  # (log_widget, message); message None clears the widget
+progress_state = {}        # progress_bar -> latest {'value', 'maximum', 'stop'}, applied by drain_log
+_progress_lock = threading.Lock()
+ui_calls = queue.Queue()   # callbacks from worker threads, run by drain_log on the Tk thread
 stop_event = threading.Event()
 selected_files = []
 files_entry = None
 folder_entry = None
 
 def run_on_ui(root, callback):
-    try:
-        root.after(0, callback)
-    except (RuntimeError, tk.TclError):
-        pass
+    """Run callback on the Tk thread at the next drain_log tick; safe from any thread."""
+    ui_calls.put(callback)
 
 def append_log(root, log_widget, message: str):
-    def write():
-        log_widget.insert(tk.END, message)
-        log_widget.see(tk.END)
-    run_on_ui(root, write)
+    log_queue.put((log_widget, message))
 
 def clear_log(root, log_widget):
-    run_on_ui(root, lambda: log_widget.delete('1.0', tk.END))
+    log_queue.put((log_widget, None))
+
+def drain_log(root):
+    """
+    Write queued log lines with one insert per widget, apply the latest progress and run queued
+    UI callbacks, then reschedule (Tk thread only). Worker threads never call into Tk themselves.
+    """
+    # Take everything queued when the tick starts, so the log never trails the progress bar.
+    # Only the newest LOG_MAX_LINES messages per widget can survive the trim below anyway.
+    pending = {}
+    for _ in range(log_queue.qsize()):
+        try:
+            log_widget, message = log_queue.get_nowait()
+        except queue.Empty:
+            break
+        if message is None:
+            pending[log_widget] = collections.deque(maxlen=LOG_MAX_LINES)
+            log_widget.delete('1.0', tk.END)
+        else:
+            pending.setdefault(log_widget, collections.deque(maxlen=LOG_MAX_LINES)).append(message)
+    for log_widget, messages in pending.items():
+        if messages:
+            log_widget.insert(tk.END, ''.join(messages))
+            # Text ends with a newline, so 'end-1c' sits on the empty line after the last message
+            first_kept = int(log_widget.index('end-1c').split('.')[0]) - LOG_MAX_LINES
+            if first_kept > 1:
+                log_widget.delete('1.0', f'{first_kept}.0')
+            log_widget.see(tk.END)
+    with _progress_lock:
+        updates = list(progress_state.items())
+        progress_state.clear()
+    for progress_bar, state in updates:
+        if 'maximum' in state:
+            progress_bar.config(maximum=state['maximum'])
+        if 'value' in state:
+            progress_bar['value'] = state['value']
+        if state.get('stop'):
+            progress_bar.stop()
+    try:
+        root.after(LOG_FLUSH_MS, drain_log, root)
+    except (RuntimeError, tk.TclError):
+        return
+    # After rescheduling: a callback may open a modal dialog, and logging must keep flowing meanwhile
+    while True:
+        try:
+            callback = ui_calls.get_nowait()
+        except queue.Empty:
+            break
+        try:
+            callback()
+        except tk.TclError as e:
+            logging.warning(f"UI update failed: {e}")
 
 def set_progress(root, progress_bar, value=None, maximum=None, stop=False):
-    def update():
+    """Record the latest progress; drain_log applies it once per tick (any thread)."""
+    with _progress_lock:
+        state = progress_state.setdefault(progress_bar, {})
         if maximum is not None:
-            progress_bar.config(maximum=maximum)
+            state['maximum'] = maximum
         if value is not None:
-            progress_bar['value'] = value
+            state['value'] = value
         if stop:
-            progress_bar.stop()
-    run_on_ui(root, update)
+            state['stop'] = True
 
 def show_error(root, title: str, message: str):
     run_on_ui(root, lambda: messagebox.showerror(title, message))
 
+def show_info(root, title: str, message: str):
+    run_on_ui(root, lambda: messagebox.showinfo(title, message))
+
+def get_client():
+    """
+    Shared Gemini client. Its httpx pool keeps connections alive across files and runs;
+    it is only rebuilt when the API key changes. Requests are retried per REQUEST_RETRY.
+    """
+    global client, _client_api_key
+    with _client_lock:
+        api_key = SETTINGS.api_key
+        if client is None or _client_api_key != api_key:
+            http_options = types.HttpOptions(
+                timeout=REQUEST_TIMEOUT_MS,
+                retry_options=REQUEST_RETRY,
+                client_args={
+                    'http2': _HTTP2_AVAILABLE,
+                    'limits': httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE),
+                },
+            )
+            client = genai.Client(api_key=api_key, http_options=http_options)
+            _client_api_key = api_key
+        return client
+
+def close_client():
+    """Close the shared client, breaking its in-flight requests; the next get_client() builds a new one."""
+    global client, _client_api_key
+    with _client_lock:
+        old, client, _client_api_key = client, None, None
+    if old is not None:
+        try:
+            old.close()
+        except Exception as e:
+            logging.warning(f"Failed to close Gemini client: {e}")
+
+def get_async_loop() -> asyncio.AbstractEventLoop:
+    """Event loop on a daemon thread, shared by every run that uses the asyncio request path."""
+    global _async_loop
+    with _client_lock:
+        if _async_loop is None:
+            _async_loop = asyncio.new_event_loop()
+            threading.Thread(target=_async_loop.run_forever, name='gemini-aio', daemon=True).start()
+        return _async_loop
+
 # =========================
 # Resource path (for icons/assets, dev + PyInstaller onefile)
 # =========================
+@functools.lru_cache(maxsize=None)
 def resource_path(rel_path: str) -> str:
     """Get absolute path to resource, works for dev and PyInstaller --onefile."""
     base_path = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
     return os.path.join(base_path, rel_path)
 
+_icon_images = {}  # path -> PhotoImage; decoded once, and kept referenced so Tk does not drop it
+
+def load_icon(root):
+    """Set the app/window icon (cross-platform): icon.png where Tk supports it, else icon.ico."""
+    icon_png = resource_path("assets/icon.png")
+    try:
+        if os.path.exists(icon_png):
+            image = _icon_images.get(icon_png)
+            if image is None:
+                image = _icon_images[icon_png] = PhotoImage(file=icon_png)
+            root.wm_iconphoto(True, image)
+            return
+    except Exception:
+        pass
+    ico_path = resource_path("assets/icon.ico")
+    if os.path.exists(ico_path):
+        try:
+            root.iconbitmap(ico_path)
+        except Exception:
+            pass
+
 # =========================
 # Save config
 # =========================
-def save_config():
-    os.makedirs(STORE_DIR, exist_ok=True)
-    config['Settings']['output_pattern'] = OUTPUT_PATTERN
-    config['Settings']['book_output_pattern'] = BOOK_OUTPUT_PATTERN
-    config['Settings']['unpublished'] = UNPUBLISHED_PLACEHOLDER
-    config['Settings']['api_key'] = API_KEY
-    config['Settings']['model'] = MODEL_NAME
-    config['Settings']['author_format_paper'] = AUTHOR_FMT_PAPER
-    config['Settings']['author_format_book'] = AUTHOR_FMT_BOOK
-    with open(CONFIG_PATH, 'w') as f:
-        config.write(f)
+_config_write_lock = threading.Lock()
+_pending_config_text = ''
+
+def _write_config_file():
+    # Every writer flushes the newest text, so overlapping saves cannot land out of order
+    with _config_write_lock:
+        try:
+            os.makedirs(STORE_DIR, exist_ok=True)
+            tmp_path = CONFIG_PATH + '.tmp'  # same folder, so os.replace stays atomic
+            with open(tmp_path, 'w') as f:
+                f.write(_pending_config_text)
+            os.replace(tmp_path, CONFIG_PATH)
+        except OSError as e:
+            logging.error(f"Failed to save config to '{CONFIG_PATH}': {e}")
+
+def save_config(new_settings: Settings):
+    """Make new_settings current; the file is written atomically on a background thread."""
+    global SETTINGS, _pending_config_text
+    SETTINGS = new_settings
+    config['Settings'].update(new_settings.to_section())
+    buf = io.StringIO()
+    config.write(buf)
+    _pending_config_text = buf.getvalue()
+    threading.Thread(target=_write_config_file).start()
 
 # =========================
 # File selection
@@ -209,6 +452,32 @@ def select_files():
             files_entry.insert(0, f"{len(selected_files)} files selected")
         files_entry.config(state='readonly')
 
+def iter_pdfs(folder: str):
+    """
+    Yield an os.DirEntry for each PDF under folder (recursive) as it is found. DirEntry caches
+    the file type from the directory listing and its stat() after the first call, so the
+    manifest check and the size sort share one stat per file. Subfolders go on an
+    explicit stack: deep trees cannot hit the recursion limit and only one directory
+    handle is open at a time.
+    """
+    pending = [folder]
+    while pending:
+        current = pending.pop()
+        subfolders = []
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subfolders.append(entry.path)
+                        elif entry.name.endswith(PDF_EXTS) and entry.is_file(follow_symlinks=False):
+                            yield entry
+                    except OSError:
+                        continue
+        except OSError as e:
+            logging.warning(f"Cannot scan folder '{current}': {e}")
+        pending.extend(reversed(subfolders))  # keep the listing order when popping
+
 def browse_folder(entry: tk.Entry):
     global selected_files, files_entry
     path = filedialog.askdirectory(title='Select PDF folder')
@@ -226,9 +495,7 @@ def browse_folder(entry: tk.Entry):
 # Settings, Help
 # =========================
 def show_config():
-    global OUTPUT_PATTERN, BOOK_OUTPUT_PATTERN, UNPUBLISHED_PLACEHOLDER, API_KEY, MODEL_NAME
-    global AUTHOR_FMT_PAPER, AUTHOR_FMT_BOOK
-
+    current = SETTINGS
     cfg_win = tk.Toplevel()
     cfg_win.title(f'{APP_NAME} — Settings')
     cfg_win.geometry('860x560')
@@ -245,44 +512,76 @@ def show_config():
 
     r = 0
     tk.Label(form, text='Output Pattern (papers):').grid(row=r, column=0, sticky='e', padx=5, pady=5)
-    pat_entry = tk.Entry(form, width=60); pat_entry.insert(0, OUTPUT_PATTERN)
+    pat_entry = tk.Entry(form, width=60); pat_entry.insert(0, current.output_pattern)
     pat_entry.grid(row=r, column=1, sticky='we', padx=5, pady=5); r += 1
 
     tk.Label(form, text='Book Output Pattern:').grid(row=r, column=0, sticky='e', padx=5, pady=5)
-    book_pat_entry = tk.Entry(form, width=60); book_pat_entry.insert(0, BOOK_OUTPUT_PATTERN)
+    book_pat_entry = tk.Entry(form, width=60); book_pat_entry.insert(0, current.book_output_pattern)
     book_pat_entry.grid(row=r, column=1, sticky='we', padx=5, pady=5); r += 1
 
     tk.Label(form, text='Unpublished Placeholder:').grid(row=r, column=0, sticky='e', padx=5, pady=5)
-    plc_entry = tk.Entry(form, width=60); plc_entry.insert(0, UNPUBLISHED_PLACEHOLDER)
+    plc_entry = tk.Entry(form, width=60); plc_entry.insert(0, current.unpublished)
     plc_entry.grid(row=r, column=1, sticky='we', padx=5, pady=5); r += 1
 
     tk.Label(form, text='Author Format (papers):').grid(row=r, column=0, sticky='e', padx=5, pady=5)
-    paper_fmt_entry = tk.Entry(form, width=60); paper_fmt_entry.insert(0, AUTHOR_FMT_PAPER)
+    paper_fmt_entry = tk.Entry(form, width=60); paper_fmt_entry.insert(0, current.author_format_paper)
     paper_fmt_entry.grid(row=r, column=1, sticky='we', padx=5, pady=5); r += 1
 
     tk.Label(form, text='Author Format (books):').grid(row=r, column=0, sticky='e', padx=5, pady=5)
-    book_fmt_entry = tk.Entry(form, width=60); book_fmt_entry.insert(0, AUTHOR_FMT_BOOK)
+    book_fmt_entry = tk.Entry(form, width=60); book_fmt_entry.insert(0, current.author_format_book)
     book_fmt_entry.grid(row=r, column=1, sticky='we', padx=5, pady=5); r += 1
 
     tk.Label(form, text='Gemini API Key:').grid(row=r, column=0, sticky='e', padx=5, pady=5)
-    api_entry_cfg = tk.Entry(form, width=60, show='*'); api_entry_cfg.insert(0, API_KEY)
+    api_entry_cfg = tk.Entry(form, width=60, show='*'); api_entry_cfg.insert(0, current.api_key)
     api_entry_cfg.grid(row=r, column=1, sticky='we', padx=5, pady=5); r += 1
 
     tk.Label(form, text='Model:').grid(row=r, column=0, sticky='e', padx=5, pady=5)
-    model_entry = tk.Entry(form, width=60); model_entry.insert(0, MODEL_NAME)
+    model_entry = tk.Entry(form, width=60); model_entry.insert(0, current.model)
     model_entry.grid(row=r, column=1, sticky='we', padx=5, pady=5); r += 1
 
+    tk.Label(form, text='Files per Request:').grid(row=r, column=0, sticky='e', padx=5, pady=5)
+    batch_entry = tk.Entry(form, width=60); batch_entry.insert(0, str(current.batch_size))
+    batch_entry.grid(row=r, column=1, sticky='we', padx=5, pady=5); r += 1
+
+    tk.Label(form, text='Parallel Workers:').grid(row=r, column=0, sticky='e', padx=5, pady=5)
+    workers_entry = tk.Entry(form, width=60); workers_entry.insert(0, str(current.max_workers))
+    workers_entry.grid(row=r, column=1, sticky='we', padx=5, pady=5); r += 1
+
+    tk.Label(form, text='Async Concurrency:').grid(row=r, column=0, sticky='e', padx=5, pady=5)
+    async_conc_entry = tk.Entry(form, width=60); async_conc_entry.insert(0, str(current.async_concurrency))
+    async_conc_entry.grid(row=r, column=1, sticky='we', padx=5, pady=5); r += 1
+
+    llm_check_var = tk.BooleanVar(value=current.llm_format_check)
+    tk.Checkbutton(form, text='Ask the model when the filename check does not match', variable=llm_check_var).grid(
+        row=r, column=1, sticky='w', padx=5, pady=5
+    ); r += 1
+
+    async_var = tk.BooleanVar(value=current.async_requests)
+    tk.Checkbutton(form, text='Send requests with asyncio instead of worker threads', variable=async_var).grid(
+        row=r, column=1, sticky='w', padx=5, pady=5
+    ); r += 1
+
     def save_and_close():
-        global OUTPUT_PATTERN, BOOK_OUTPUT_PATTERN, UNPUBLISHED_PLACEHOLDER, API_KEY, MODEL_NAME
-        global AUTHOR_FMT_PAPER, AUTHOR_FMT_BOOK
-        OUTPUT_PATTERN = pat_entry.get().strip() or DEFAULT_OUTPUT_PATTERN
-        BOOK_OUTPUT_PATTERN = book_pat_entry.get().strip() or DEFAULT_BOOK_OUTPUT_PATTERN
-        UNPUBLISHED_PLACEHOLDER = plc_entry.get().strip() or DEFAULT_UNPUBLISHED
-        AUTHOR_FMT_PAPER = paper_fmt_entry.get().strip() or DEFAULT_AUTHOR_FMT_PAPER
-        AUTHOR_FMT_BOOK  = book_fmt_entry.get().strip() or DEFAULT_AUTHOR_FMT_BOOK
-        API_KEY   = api_entry_cfg.get().strip() or API_KEY
-        MODEL_NAME = model_entry.get().strip() or DEFAULT_MODEL
-        save_config()
+        def read_count(entry, default):
+            try:
+                return max(1, int(entry.get().strip()))
+            except ValueError:
+                return default
+        save_config(dataclasses.replace(
+            SETTINGS,
+            output_pattern=pat_entry.get().strip() or DEFAULT_OUTPUT_PATTERN,
+            book_output_pattern=book_pat_entry.get().strip() or DEFAULT_BOOK_OUTPUT_PATTERN,
+            unpublished=plc_entry.get().strip() or DEFAULT_UNPUBLISHED,
+            author_format_paper=paper_fmt_entry.get().strip() or DEFAULT_AUTHOR_FMT_PAPER,
+            author_format_book=book_fmt_entry.get().strip() or DEFAULT_AUTHOR_FMT_BOOK,
+            api_key=api_entry_cfg.get().strip() or SETTINGS.api_key,
+            model=model_entry.get().strip() or DEFAULT_MODEL,
+            batch_size=read_count(batch_entry, DEFAULT_BATCH_SIZE),
+            max_workers=read_count(workers_entry, DEFAULT_MAX_WORKERS),
+            llm_format_check=llm_check_var.get(),
+            async_requests=async_var.get(),
+            async_concurrency=read_count(async_conc_entry, DEFAULT_ASYNC_CONCURRENCY),
+        ))
         cfg_win.destroy()
 
     tk.Button(form, text='Save', command=save_and_close).grid(row=r, column=1, sticky='e', padx=5, pady=10)
@@ -372,13 +671,33 @@ Settings overview (Config → Settings…):
 - Model
   Defaults to "{DEFAULT_MODEL}". You can override if needed.
 
+- Files per Request
+  How many PDFs are sent to the model in one request. Default: {DEFAULT_BATCH_SIZE}.
+  Larger values mean fewer round-trips; lower it if results come back incomplete.
+
+- Parallel Workers
+  How many requests run at the same time. Default: {DEFAULT_MAX_WORKERS}.
+  Lower it if you hit API rate limits.
+
+- Async Concurrency
+  How many requests run at the same time when asyncio is on. Default: {DEFAULT_ASYNC_CONCURRENCY}.
+
+- Ask the model when the filename check does not match
+  Off by default. When on, names that fail the local format check are sent to the model
+  for a second opinion (one extra request per file).
+
+- Send requests with asyncio instead of worker threads
+  Off by default. When on, all requests share one background event loop and Async
+  Concurrency replaces Parallel Workers as the limit.
+
 - Embedded Cheatsheet (inside Settings)
   A compact reference of patterns, tokens, and examples.
 
 How renaming is decided:
 A) Already-formatted check:
-   The app uses a strict validator to decide if a filename already matches the current pattern
+   The app checks locally whether a filename already matches the current pattern
    (including author-format rules). If yes → “Already formatted—skipped”.
+   Optionally (Settings), names that do not match are double-checked by the model.
 
 B) Metadata extraction:
    The app reads the first N pages and asks the model to return strict JSON with:
@@ -395,12 +714,14 @@ C) Filename building:
 D) Collisions & duplicates:
    • If the new name equals the current name → “Skipped (same name)”.
    • If a file with the target name exists:
-       - If contents match (SHA-1) → “Duplicate content detected; skipped rename”.
+       - If contents match (content hash) → “Duplicate content detected; skipped rename”.
        - Else the app appends a short hash (e.g., “[1a2b3c4d]”) to make a unique name.
 
 E) Skips:
    • Empty metadata (nothing useful extracted) → skipped.
    • Book mode but no title found → skipped (to avoid meaningless names).
+   • Files renamed or found formatted in an earlier run, and unchanged since → skipped
+     without any model call (reported as a count at the end).
 
 First run:
 - If no config file exists, a Setup Guide pops up automatically.
@@ -414,6 +735,8 @@ Privacy & scope:
 Troubleshooting:
 - “Gemini API key is required” → Set your key in Settings.
 - “Invalid JSON” from model → Increase pages to extract, verify the PDF has metadata on early pages.
+- “429” / “RESOURCE_EXHAUSTED” → Rate limited. Requests are retried with backoff; if it persists,
+  lower Parallel Workers.
 - Repeated “Skipped (same name)” → Your template currently evaluates to the existing filename.
 - Wrong author format → Adjust the Author Format fields in Settings; use tokens correctly.
 - Unexpected publisher/journal → For books, {{journal}} is the publisher by design.
@@ -421,6 +744,10 @@ Troubleshooting:
 Config & storage:
 - Config file: created under your user directory (pdf_metadata_renamer.config).
 - ENV file (optional API key): pdf_metadata_renamer.env in the same folder.
+- Hash cache: hash_cache.sqlite in the same folder; safe to delete (it is rebuilt as needed).
+- Processed files: processed.sqlite in the same folder. Files handled in an earlier run are
+  skipped while unchanged (same size, modification time and name) and the naming settings
+  are the same. Delete it to process everything again.
 - Both are created in the app’s storage directory shown by your OS (LOCALAPPDATA on Windows; home on others).
 
 Tip:
@@ -457,18 +784,110 @@ def show_setup_guide(root):
 # =========================
 # PDF extraction
 # =========================
-def extract_first_n_pages(pdf_path: str, n: int) -> bytes:
+def extract_first_n_pages(pdf_path: str, n: int) -> io.BytesIO:
     if n < 1:
         raise ValueError('Pages to extract must be at least 1.')
-    reader = PdfReader(pdf_path)
-    writer = PdfWriter()
-    page_count = min(n, len(reader.pages))
-    for page in reader.pages[:page_count]:
-        writer.add_page(page)
-    buf = io.BytesIO()
-    writer.write(buf)
-    buf.seek(0)
-    return buf.read()
+    with pymupdf.open(pdf_path) as src:
+        if src.page_count > n:
+            # Copy only the leading page range; MuPDF never decodes the remaining pages.
+            with pymupdf.open() as dst:
+                dst.insert_pdf(src, from_page=0, to_page=n - 1, annots=False, links=False)
+                # Serialize straight into the buffer that gets uploaded; no intermediate bytes copy
+                buf = io.BytesIO()
+                dst.save(buf, garbage=3, deflate=True)
+            buf.seek(0)
+            return buf
+    # The whole document fits in the snippet: upload the original bytes, no rewrite
+    with open(pdf_path, 'rb') as f:
+        return io.BytesIO(f.read())
+
+def _snippet_bytes(pdf_path: str, n: int) -> bytes:
+    return extract_first_n_pages(pdf_path, n).getvalue()
+
+def _init_extraction_worker():
+    # MuPDF reports recoverable damage through exceptions already; keep child stderr quiet
+    pymupdf.TOOLS.mupdf_display_errors(False)
+
+def start_extraction_pool(workers: int):
+    """
+    Process pool for snippet extraction during one run. PyMuPDF holds the GIL while it parses,
+    so worker threads cannot extract in parallel; processes can. Spawned (not forked) for
+    Windows parity and so no Tk or HTTP state is copied into the children. Each child
+    re-imports this script (~90 MB), hence the cap and the shutdown at the end of the run.
+    """
+    global _extraction_pool
+    with _client_lock:
+        if _extraction_pool is None:
+            _extraction_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=max(1, min(os.cpu_count() or 1, workers)),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_extraction_worker,
+            )
+
+def shutdown_extraction_pool():
+    global _extraction_pool
+    with _client_lock:
+        pool, _extraction_pool = _extraction_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def terminate_extraction_pool():
+    """Kill the extraction processes outright; waiting batches see a broken pool and give up."""
+    global _extraction_pool
+    with _client_lock:
+        pool, _extraction_pool = _extraction_pool, None
+    if pool is None:
+        return
+    terminate_workers = getattr(pool, 'terminate_workers', None)  # Python 3.14+
+    if terminate_workers is not None:
+        terminate_workers()
+        return
+    processes = list((getattr(pool, '_processes', None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+def _discard_extraction_pool(pool):
+    global _extraction_pool
+    with _client_lock:
+        if _extraction_pool is pool:
+            _extraction_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def extract_snippets(paths: list, n: int) -> list:
+    """
+    extract_first_n_pages for several files at once in the extraction pool. Returns a buffer,
+    or the exception raised for that file, per path. Falls back to this thread, one document
+    at a time, if there is no pool or it breaks.
+    """
+    pool = _extraction_pool
+    try:
+        if pool is None:
+            raise RuntimeError('no extraction pool is running')
+        futures = [pool.submit(_snippet_bytes, path, n) for path in paths]
+        snippets = []
+        for future in futures:
+            try:
+                snippets.append(io.BytesIO(future.result()))
+            except concurrent.futures.BrokenExecutor:
+                raise
+            except Exception as e:
+                snippets.append(e)
+        return snippets
+    except RuntimeError as e:  # BrokenProcessPool, or submit after shutdown
+        if stop_event.is_set():  # the pool was terminated by Abort
+            return [e] * len(paths)
+        logging.warning(f"Extraction pool unavailable, extracting in-process: {e}")
+        if pool is not None:
+            _discard_extraction_pool(pool)
+    snippets = []
+    for path in paths:
+        try:
+            with _pymupdf_lock:
+                snippets.append(extract_first_n_pages(path, n))
+        except Exception as e:
+            snippets.append(e)
+    return snippets
 
 def _metadata_response_to_dict(data_raw) -> dict:
     if isinstance(data_raw, list):
@@ -537,63 +956,160 @@ def _metadata_authors(value) -> list:
 # =========================
 # Gemini metadata extraction
 # =========================
-def get_metadata_from_snippet(pdf_bytes: bytes, is_book: bool) -> dict:
-    global client
-    upload_config = types.UploadFileConfig(display_name='snippet.pdf', mime_type='application/pdf')
-    snippet_file = None
+_RE_FENCE = re.compile(r'\A\s*```(?:json)?\s*|\s*```\s*\Z', re.I)
+_JSON_DECODER = json.JSONDecoder()
+
+def _parse_model_json(text: str):
+    """
+    Parse a JSON response, tolerating Markdown code fences and trailing text after the
+    first JSON value, so a cosmetic glitch does not cost a whole new upload + generate.
+    """
+    text = _RE_FENCE.sub('', text or '')
     try:
-        snippet_file = client.files.upload(file=io.BytesIO(pdf_bytes), config=upload_config)
-        system_instruction = (
-            'You are an academic document manager. '
-            'From the first pages of the provided PDF, extract ONLY these fields: '
-            'Authors, Year, Journal, Title. For books, Journal should be the Publisher. '
-            'If a field is NOT clearly present, return it EMPTY ("" or []); DO NOT GUESS or fabricate. '
-            'Return strict JSON with keys: authors (array), year (string), journal (string), title (string).'
-        )
-        response = client.models.generate_content(
-            model=MODEL_NAME,
-            contents=[system_instruction, snippet_file],
-            config=types.GenerateContentConfig(response_mime_type='application/json', system_instruction=system_instruction)
-        )
-        logging.info(f"Gemini raw response: {response.text}")
+        return _json_loads(text)
+    except ValueError:
+        pass
+    starts = [i for i in (text.find('{'), text.find('[')) if i >= 0]
+    if starts:
         try:
-            data_raw = json.loads(response.text)
-            data = _metadata_response_to_dict(data_raw)
-        except json.JSONDecodeError:
-            raise ValueError(f'Invalid JSON: {response.text}')
-    finally:
-        if snippet_file is not None:
-            snippet_name = getattr(snippet_file, 'name', None)
-            if snippet_name:
-                try:
-                    try:
-                        client.files.delete(name=snippet_name)
-                    except TypeError:
-                        client.files.delete(snippet_name)
-                except Exception as e:
-                    logging.warning(f"Failed to delete uploaded snippet '{snippet_name}': {e}")
+            return _JSON_DECODER.raw_decode(text, min(starts))[0]
+        except ValueError:
+            pass
+    raise ValueError(f'Invalid JSON: {text}')
 
+def _normalize_metadata(data: dict) -> dict:
     raw_year = _metadata_text(data.get('year'))
     year = 'n.d.' if (raw_year == '' or raw_year.lower() in {'unknown','unknownyear','n/a','na'}) else raw_year
 
     authors = _metadata_authors(data.get('authors') or data.get('author'))
     unknown_tokens = {'unknown','n/a','na','none','anonymous','unknown author','unknownauthors'}
     authors = [a for a in authors if a.strip() and a.strip().lower() not in unknown_tokens]
-    authors = [titlecase(a) for a in authors]
+    authors = [_tc(a) for a in authors]
 
     jraw = data.get('journal') or data.get('publisher')
     journal = _metadata_text(jraw)
     if journal.lower() in unknown_tokens:
         journal = ''
-    journal = titlecase(journal) if journal else ''
+    journal = _tc(journal) if journal else ''
 
     title = _metadata_text(data.get('title'))
     if title.lower() in unknown_tokens or title.lower() == 'unknowntitle':
         title = ''
-    title = titlecase(title) if title else ''
+    title = _tc(title) if title else ''
 
     return {'authors': authors, 'year': year, 'journal': journal, 'title': title}
 
+def _batch_response_to_list(data_raw, count: int) -> list:
+    """Map a batched response onto the submitted files; entries the model dropped become None."""
+    if isinstance(data_raw, dict):
+        data_raw = data_raw.get('results', data_raw.get('files'))
+    if not isinstance(data_raw, list):
+        raise ValueError('Invalid JSON shape: expected {"results": [...]}.')
+    out = [None] * count
+    unindexed = []
+    for item in data_raw:
+        if not isinstance(item, dict):
+            continue
+        index = item.get('index', item.get('file'))
+        try:
+            index = int(index) - 1
+        except (TypeError, ValueError):
+            index = None
+        if index is not None and 0 <= index < count and out[index] is None:
+            out[index] = item
+        else:
+            unindexed.append(item)
+    # Fall back to response order for entries without a usable index
+    free = iter(i for i, item in enumerate(out) if item is None)
+    for item in unindexed:
+        i = next(free, None)
+        if i is None:
+            break
+        out[i] = item
+    return out
+
+_BATCH_INSTRUCTION = (
+    'You are an academic document manager. '
+    'You receive one or more PDFs, each introduced by a "File <n>:" label. '
+    'From the first pages of EACH PDF, extract ONLY these fields: '
+    'Authors, Year, Journal, Title. For books, Journal should be the Publisher. '
+    'If a field is NOT clearly present, return it EMPTY ("" or []); DO NOT GUESS or fabricate. '
+    'Return strict JSON as {"results": [...]} with exactly one object per file, in file order, '
+    'each with keys: index (integer n of "File <n>:"), authors (array), year (string), '
+    'journal (string), title (string).'
+)
+
+def _snippet_upload_config(i: int):
+    return types.UploadFileConfig(display_name=f'snippet-{i}.pdf', mime_type='application/pdf')
+
+def _batch_request(uploaded: list) -> dict:
+    """generate_content keyword arguments for a batch of uploaded snippets."""
+    contents = [_BATCH_INSTRUCTION]
+    for i, snippet_file in enumerate(uploaded, 1):
+        contents += [f'File {i}:', snippet_file]
+    return dict(
+        contents=contents,
+        config=types.GenerateContentConfig(response_mime_type='application/json', system_instruction=_BATCH_INSTRUCTION)
+    )
+
+def _batch_results(text: str, count: int) -> list:
+    logging.info(f"Gemini raw response: {text}")
+    data_raw = _parse_model_json(text)
+    if count == 1 and not (isinstance(data_raw, dict) and 'results' in data_raw):
+        items = [data_raw]
+    else:
+        items = _batch_response_to_list(data_raw, count)
+    return [_normalize_metadata(_metadata_response_to_dict(item)) if item is not None else None for item in items]
+
+def get_metadata_batch(snippets: list, is_book: bool, settings: Settings = None) -> list:
+    """
+    Upload every snippet buffer and extract metadata for all of them with a single generate_content
+    call. Returns one metadata dict per snippet, or None where the model returned no entry.
+    """
+    settings = settings or SETTINGS
+    api = get_client()
+    uploaded = []
+    try:
+        for i, snippet in enumerate(snippets, 1):
+            uploaded.append(api.files.upload(file=snippet, config=_snippet_upload_config(i)))
+        response = api.models.generate_content(model=settings.model, **_batch_request(uploaded))
+        return _batch_results(response.text, len(snippets))
+    finally:
+        # get_client() again: if an abort closed the client mid-request, clean up through a fresh one
+        api = get_client()
+        for snippet_file in uploaded:
+            snippet_name = getattr(snippet_file, 'name', None)
+            if snippet_name:
+                try:
+                    try:
+                        api.files.delete(name=snippet_name)
+                    except TypeError:
+                        api.files.delete(snippet_name)
+                except Exception as e:
+                    logging.warning(f"Failed to delete uploaded snippet '{snippet_name}': {e}")
+
+async def get_metadata_batch_async(snippets: list, is_book: bool, settings: Settings = None) -> list:
+    """get_metadata_batch on the client's asyncio API; the uploads and deletes run concurrently."""
+    settings = settings or SETTINGS
+    aio = get_client().aio
+    uploads = await asyncio.gather(
+        *(aio.files.upload(file=snippet, config=_snippet_upload_config(i)) for i, snippet in enumerate(snippets, 1)),
+        return_exceptions=True
+    )
+    uploaded = [u for u in uploads if not isinstance(u, BaseException)]
+    try:
+        for u in uploads:
+            if isinstance(u, BaseException):
+                raise u
+        response = await aio.models.generate_content(model=settings.model, **_batch_request(uploaded))
+        return _batch_results(response.text, len(snippets))
+    finally:
+        names = [n for n in (getattr(u, 'name', None) for u in uploaded) if n]
+        deletes = await asyncio.gather(*(aio.files.delete(name=n) for n in names), return_exceptions=True)
+        for snippet_name, outcome in zip(names, deletes):
+            if isinstance(outcome, BaseException):
+                logging.warning(f"Failed to delete uploaded snippet '{snippet_name}': {outcome}")
+
 def _metadata_all_empty(meta: dict) -> bool:
     authors = meta.get('authors') or []
     authors_norm = [((a or '').strip().lower()) for a in authors]
@@ -608,16 +1124,38 @@ def _metadata_all_empty(meta: dict) -> bool:
 # =========================
 # Author formatting
 # =========================
-_SUFFIXES = {'jr', 'jr.', 'sr', 'sr.', 'ii', 'iii', 'iv'}
+_SUFFIXES = frozenset({'jr', 'jr.', 'sr', 'sr.', 'ii', 'iii', 'iv'})
+_RE_WS = re.compile(r'\s+')
+_RE_AUTHOR_SEP = re.compile(r'[;,]')
+# One pass over a rendered author: tidy commas, drop empty (), glue dots, collapse whitespace
+_RE_AUTHOR_CLEANUP = re.compile(r'(?P<comma>\s*,(?:\s*,)*)|(?P<paren>\s*\(\s*\))|(?P<dot>\s+\.)|(?P<ws>\s+)')
+_AUTHOR_CLEANUP_REPL = {'comma': ',', 'paren': '', 'dot': '.', 'ws': ' '}
+
+def _author_cleanup_repl(m) -> str:
+    return _AUTHOR_CLEANUP_REPL[m.lastgroup]
+
+_AUTHOR_TOKENS = frozenset({'first', 'middle', 'surname', 'last', 'family', 'suffix',
+                            'first_initial', 'surname_initial', 'middle_initials'})
+
+@functools.lru_cache(maxsize=8)
+def _plain_author_format(fmt: str) -> bool:
+    """True when fmt only uses bare documented {tokens}, so format_map gives the same result as replacing them."""
+    if '{{' in fmt or '}}' in fmt:
+        return False
+    try:
+        return all(name is None or (name in _AUTHOR_TOKENS and not spec and conv is None)
+                   for _, name, spec, conv in string.Formatter().parse(fmt))
+    except ValueError:
+        return False
 
 def _parse_author(full: str):
     if not full:
         return {'first':'', 'middle':'', 'surname':'', 'suffix':''}
-    raw = re.sub(r'\s+', ' ', full).strip()
+    raw = _RE_WS.sub(' ', full).strip()
     comma_parts = [p.strip() for p in raw.split(',') if p.strip()]
     if len(comma_parts) >= 2 and comma_parts[1].lower() not in _SUFFIXES:
         surname = comma_parts[0]
-        rest = re.sub(r'[;]', ' ', ' '.join(comma_parts[1:])).strip()
+        rest = ' '.join(comma_parts[1:]).replace(';', ' ').strip()
         parts = [p for p in rest.split() if p]
         suffix = ''
         if parts and parts[-1].lower() in _SUFFIXES:
@@ -627,7 +1165,7 @@ def _parse_author(full: str):
         middle = ' '.join(parts[1:]) if len(parts) > 1 else ''
         return {'first': first, 'middle': middle, 'surname': surname, 'suffix': suffix}
 
-    s = re.sub(r'[;,]', ' ', raw).strip()
+    s = _RE_AUTHOR_SEP.sub(' ', raw).strip()
     parts = [p for p in s.split() if p]
     suffix = ''
     if parts and parts[-1].lower() in _SUFFIXES:
@@ -662,17 +1200,17 @@ def _render_author(fmt: str, comps: dict) -> str:
         'surname_initial': _initial(comps.get('surname', '')),
         'middle_initials': _middle_initials(comps.get('middle', '')),
     }
-    out = fmt
-    for k, v in tokens.items():
-        out = out.replace('{' + k + '}', v)
-    out = re.sub(r'\s+', ' ', out).strip()
-    out = re.sub(r'\s+,', ',', out); out = re.sub(r',\s*,', ',', out)
-    out = re.sub(r'\(\s*\)', '', out); out = re.sub(r'\s+\.', '.', out)
-    out = out.strip(' ,')
-    return titlecase(out) if out else ''
-
-def format_authors_list(authors_list, is_book: bool) -> str:
-    fmt = AUTHOR_FMT_BOOK if is_book else AUTHOR_FMT_PAPER
+    if _plain_author_format(fmt):
+        out = fmt.format_map(tokens)
+    else:
+        # Escaped braces, unknown names or field syntax: substitute only the documented tokens literally
+        out = fmt
+        for k, v in tokens.items():
+            out = out.replace('{' + k + '}', v)
+    out = _RE_AUTHOR_CLEANUP.sub(_author_cleanup_repl, out).strip(' ,')
+    return _tc(out) if out else ''
+
+def format_authors_list(fmt: str, authors_list) -> str:
     if not authors_list:
         return 'UnknownAuthors'
     rendered = []
@@ -686,49 +1224,227 @@ def format_authors_list(authors_list, is_book: bool) -> str:
 # =========================
 # Filename builder
 # =========================
-def build_new_filename(meta: dict, is_book: bool = False) -> str:
-    journal = meta.get('journal') or UNPUBLISHED_PLACEHOLDER
-    authors_str = format_authors_list(meta.get('authors', []), is_book)
-    pattern = BOOK_OUTPUT_PATTERN if is_book else OUTPUT_PATTERN
-    filename = pattern.format(
+def build_new_filename(meta: dict, is_book: bool = False, settings: Settings = None) -> str:
+    settings = settings or SETTINGS
+    journal = meta.get('journal') or settings.unpublished
+    authors_str = format_authors_list(settings.author_format_for(is_book), meta.get('authors', []))
+    filename = settings.output_pattern_for(is_book).format(
         journal=journal,
         year=meta.get('year','n.d.'),
         authors=authors_str,
         title=meta.get('title','UnknownTitle')
     )
-    cleaned = ''.join(c for c in filename if c not in INVALID_FILENAME_CHARS)
-    return ' '.join(cleaned.split()).strip()
+    return _RE_WS.sub(' ', filename.translate(_INVALID_TRANS)).strip()
 
 # =========================
 # Content hash & duplicates
 # =========================
-def _sha1_hex(path: str, chunk_size: int = 1 << 20) -> str:
-    h = hashlib.sha1()
+def _content_hash_hex(path: str, chunk_size: int = 1 << 22) -> str:
+    h = _content_hasher()
     with open(path, 'rb') as f:
         for chunk in iter(lambda: f.read(chunk_size), b''):
             h.update(chunk)
     return h.hexdigest()
 
-def _same_file(a: str, b: str) -> bool:
+class HashCache:
+    """
+    Content hashes persisted across runs in SQLite. An entry is reused while the file's
+    size and mtime_ns are unchanged, so re-scanning a folder does not re-read every PDF.
+    Use from a single thread.
+    """
+    def __init__(self, db_path: str):
+        self.algorithm = getattr(_content_hasher(), 'name', 'sha256')
+        self.db = sqlite3.connect(db_path)
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS files '
+            '(path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, algo TEXT, sha TEXT)'
+        )
+
+    def get(self, path: str) -> str:
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        row = self.db.execute('SELECT size, mtime_ns, algo, sha FROM files WHERE path = ?', (path,)).fetchone()
+        if row and row[:3] == (st.st_size, st.st_mtime_ns, self.algorithm):
+            return row[3]
+        digest = _content_hash_hex(path)
+        self.db.execute(
+            'INSERT OR REPLACE INTO files (path, size, mtime_ns, algo, sha) VALUES (?, ?, ?, ?, ?)',
+            (path, st.st_size, st.st_mtime_ns, self.algorithm, digest)
+        )
+        return digest
+
+    def moved(self, src: str, dst: str):
+        self.db.execute('DELETE FROM files WHERE path = ?', (os.path.abspath(dst),))
+        self.db.execute('UPDATE files SET path = ? WHERE path = ?', (os.path.abspath(dst), os.path.abspath(src)))
+
+    def close(self):
+        try:
+            self.db.commit()
+        finally:
+            self.db.close()
+
+class ProcessedManifest:
+    """
+    Files renamed (or found already formatted) in earlier runs, keyed by size, mtime_ns and
+    name, so no file is read to recognize it. A file is skipped while all three are unchanged
+    and it was handled with the current naming settings. Entries are loaded up front, so lookups work from any thread; record()
+    must be called from the thread that opened the manifest.
+    """
+    def __init__(self, db_path: str):
+        self.db = sqlite3.connect(db_path)
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS processed '
+            '(size INTEGER, mtime_ns INTEGER, name TEXT, signature TEXT, PRIMARY KEY (size, mtime_ns, name))'
+        )
+        self.entries = {
+            (size, mtime_ns, name): signature
+            for size, mtime_ns, name, signature in self.db.execute('SELECT size, mtime_ns, name, signature FROM processed')
+        }
+        self.skipped = 0
+        self._uncommitted = 0
+
+    def unprocessed(self, items, signature: str):
+        """Yield the paths (or DirEntry objects) not already handled with these naming settings."""
+        for item in items:
+            try:
+                st = _stat(item)
+            except OSError:
+                yield item
+                continue
+            if self.entries.get((st.st_size, st.st_mtime_ns, os.path.basename(os.fspath(item)))) == signature:
+                self.skipped += 1
+                continue
+            yield item
+
+    def record(self, path: str, signature: str):
+        st = os.stat(path)
+        self.db.execute(
+            'INSERT OR REPLACE INTO processed (size, mtime_ns, name, signature) VALUES (?, ?, ?, ?)',
+            (st.st_size, st.st_mtime_ns, os.path.basename(path), signature)
+        )
+        self._uncommitted += 1
+        if self._uncommitted >= MANIFEST_COMMIT_EVERY:
+            self.db.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        try:
+            self.db.commit()
+        finally:
+            self.db.close()
+
+def _naming_signature(settings: Settings, is_book: bool) -> str:
+    """Everything that decides a file's new name besides its metadata."""
+    return '\x1f'.join((
+        'book' if is_book else 'paper',
+        settings.output_pattern_for(is_book),
+        settings.author_format_for(is_book),
+        settings.unpublished,
+    ))
+
+def _cached_hash(path: str, hashes=None) -> str:
+    return hashes.get(path) if hashes is not None else _content_hash_hex(path)
+
+def _head_tail(path: str, size: int, span: int = 1 << 16) -> bytes:
+    with open(path, 'rb') as f:
+        head = f.read(span)
+        if size <= 2 * span:
+            return head + f.read()
+        f.seek(-span, os.SEEK_END)
+        return head + f.read(span)
+
+def _same_file(a: str, b: str, hashes=None) -> bool:
+    """Cheap checks first (inode, size, first/last 64 KiB); hash only when those all agree."""
     try:
-        if os.path.getsize(a) != os.path.getsize(b):
+        sa, sb = os.stat(a), os.stat(b)
+        if os.path.samestat(sa, sb):
+            return True
+        if sa.st_size != sb.st_size:
             return False
-        return _sha1_hex(a) == _sha1_hex(b)
+        if _head_tail(a, sa.st_size) != _head_tail(b, sb.st_size):
+            return False
+        return _cached_hash(a, hashes) == _cached_hash(b, hashes)
     except Exception:
         return False
 
 # =========================
-# Filename format validator (LLM-assisted)
+# Filename format validator
 # =========================
-def filename_already_formatted(file_path: str, is_book: bool) -> bool:
+_NAME_RE = r"[^\W\d_][\w'’.\-]*"
+_AUTHOR_TOKEN_RES = {
+    'first': _NAME_RE,
+    'middle': rf'{_NAME_RE}(?: {_NAME_RE})*',
+    'surname': rf'{_NAME_RE}(?: {_NAME_RE})*',
+    'suffix': r'(?i:jr|sr)\.?|(?i:ii|iii|iv)',
+    'first_initial': r'[^\W\d_]',
+    'surname_initial': r'[^\W\d_]',
+    'middle_initials': r'[^\W\d_]\.(?: [^\W\d_]\.)*',
+}
+_AUTHOR_TOKEN_RES['last'] = _AUTHOR_TOKEN_RES['family'] = _AUTHOR_TOKEN_RES['surname']
+_OPTIONAL_AUTHOR_TOKENS = {'middle', 'middle_initials', 'suffix'}
+_FIELD_TOKEN_RES = {'journal': r'.+?', 'year': r'\d{4}[a-z]?|n\.d\.', 'title': r'.+?'}
+_PLACEHOLDER_RE = re.compile(r'\{(\w+)\}')
+_HASH_SUFFIX_RE = r'(?: \[[0-9a-f]{8}(?:-\d+)?\])?'
+
+def _literal_to_regex(text: str) -> str:
+    # Mirror build_new_filename: illegal characters are dropped and whitespace collapsed
+    text = text.translate(_INVALID_TRANS)
+    return ' ?'.join(re.escape(chunk) for chunk in re.split(r'\s+', text))
+
+def _template_to_regex(template: str, token_res: dict, optional=()) -> str:
+    out, pos = [], 0
+    for m in _PLACEHOLDER_RE.finditer(template):
+        out.append(_literal_to_regex(template[pos:m.start()]))
+        body = token_res.get(m.group(1), r'.+?')
+        out.append(f'(?:{body})?' if m.group(1) in optional else f'(?:{body})')
+        pos = m.end()
+    out.append(_literal_to_regex(template[pos:]))
+    return ''.join(out)
+
+@functools.lru_cache(maxsize=8)
+def _formatted_name_regex(pattern: str, author_fmt: str):
+    """Compile the filename template (with authors rendered per author_fmt) into a full-match regex."""
+    author = _template_to_regex(author_fmt.strip(), _AUTHOR_TOKEN_RES, _OPTIONAL_AUTHOR_TOKENS)
+    field_res = dict(_FIELD_TOKEN_RES, authors=f'UnknownAuthors|{author}(?:, ?{author})*')
+    base, ext = os.path.splitext(pattern)
+    if '{' in ext or '}' in ext:
+        base, ext = pattern, ''
+    # Names that received a collision suffix ("... [1a2b3c4d].pdf") count as formatted too
+    regex = _template_to_regex(base.strip(), field_res) + _HASH_SUFFIX_RE
+    if ext:
+        regex += f'(?i:{re.escape(ext)})'
+    return re.compile(regex)
+
+def filename_already_formatted(file_path: str, is_book: bool, settings: Settings = None) -> bool:
+    """
+    Check locally whether the base filename already conforms to the current pattern
+    (including author-format rules). Returns True to skip renaming.
+    """
+    settings = settings or SETTINGS
+    regex = _formatted_name_regex(settings.output_pattern_for(is_book), settings.author_format_for(is_book))
+    if regex.fullmatch(os.path.basename(file_path)):
+        return True
+    if settings.llm_format_check:
+        return _llm_filename_check(file_path, is_book, settings)
+    return False
+
+def _pdf_info_hint(file_path: str) -> str:
+    """Title/author from the PDF info dictionary; read via the trailer, no page is loaded."""
+    try:
+        with _pymupdf_lock, pymupdf.open(file_path) as doc:  # runs on batch worker threads
+            info = doc.metadata or {}
+    except Exception:
+        return ''
+    return '; '.join(f"{key}: {info[key]}" for key in ('title', 'author') if info.get(key))
+
+def _llm_filename_check(file_path: str, is_book: bool, settings: Settings) -> bool:
     """
     Ask the model to validate if the base filename already conforms to the current pattern
     (including author-format rules). Returns True to skip renaming.
     """
-    global client
     name = os.path.basename(file_path)
-    pattern = BOOK_OUTPUT_PATTERN if is_book else OUTPUT_PATTERN
-    author_format = AUTHOR_FMT_BOOK if is_book else AUTHOR_FMT_PAPER
+    pattern = settings.output_pattern_for(is_book)
+    author_format = settings.author_format_for(is_book)
     mode = 'book' if is_book else 'paper'
     rules = (
         f"Authors must follow this configured author format exactly: {author_format}. "
@@ -746,13 +1462,16 @@ def filename_already_formatted(file_path: str, is_book: bool) -> bool:
         f"Expected author format: {author_format}\nRules: {rules}\n"
         "Decide if the filename is already correctly formatted."
     )
+    hint = _pdf_info_hint(file_path)
+    if hint:
+        prompt += f"\nEmbedded PDF metadata (may be incomplete or wrong): {hint}"
     try:
-        resp = client.models.generate_content(
-            model=MODEL_NAME,
+        resp = get_client().models.generate_content(
+            model=settings.model,
             contents=[prompt],
             config=types.GenerateContentConfig(response_mime_type='application/json', system_instruction=system_instruction)
         )
-        data = json.loads(resp.text)
+        data = _parse_model_json(resp.text)
         if isinstance(data, dict):
             val = data.get('ok')
             if isinstance(val, bool):
@@ -766,67 +1485,338 @@ def filename_already_formatted(file_path: str, is_book: bool) -> bool:
 # =========================
 # Processing
 # =========================
+ALREADY_FORMATTED_NOTE = 'Already formatted—skipped'
+
+def _extract_batch(paths, pages, is_book, settings):
+    """
+    Run the format check and snippet extraction for each path. Returns the per-path
+    [path, meta, note] results, the ones still needing metadata, and their snippets.
+    """
+    results = [[path, None, None] for path in paths]
+    to_extract = []
+    for result in results:
+        if stop_event.is_set():
+            return results, [], []
+        try:
+            if filename_already_formatted(result[0], is_book, settings):
+                result[2] = ALREADY_FORMATTED_NOTE
+                continue
+            to_extract.append(result)
+        except Exception as e:
+            result[2] = f'Error: {e}'
+    pending, snippets = [], []
+    if to_extract:
+        for result, snippet in zip(to_extract, extract_snippets([r[0] for r in to_extract], pages)):
+            if isinstance(snippet, Exception):
+                result[2] = f'Error: {snippet}'
+            else:
+                snippets.append(snippet)
+                pending.append(result)
+    return results, pending, snippets
+
+def _attach_metadata(pending, metas):
+    """Store fetched metadata (or the exception that replaced it) on the pending results."""
+    if isinstance(metas, Exception):
+        for result in pending:
+            result[2] = f'Error: {metas}'
+        return
+    for result, meta in zip(pending, metas):
+        if meta is None:
+            result[2] = 'Error: no metadata returned for this file'
+        result[1] = meta
+
+def _prepare_batch(paths, pages, is_book, settings):
+    """
+    Run the format check and snippet extraction for each path, then fetch metadata for the
+    remaining files with one batched Gemini call. Returns (path, meta, note) per input, where
+    note is a log line for files that were skipped or failed before renaming.
+    """
+    if stop_event.is_set():
+        return []
+    results, pending, snippets = _extract_batch(paths, pages, is_book, settings)
+    if pending and not stop_event.is_set():
+        try:
+            metas = get_metadata_batch(snippets, is_book, settings)
+        except Exception as e:
+            metas = e
+        _attach_metadata(pending, metas)
+    return [tuple(result) for result in results]
+
+async def _prepare_batch_async(paths, pages, is_book, settings, limit: asyncio.Semaphore):
+    """_prepare_batch for the asyncio path; extraction runs in a thread so the loop never blocks."""
+    async with limit:
+        if stop_event.is_set():
+            return []
+        results, pending, snippets = await asyncio.to_thread(_extract_batch, paths, pages, is_book, settings)
+        if pending:
+            try:
+                metas = await get_metadata_batch_async(snippets, is_book, settings)
+            except Exception as e:
+                metas = e
+            _attach_metadata(pending, metas)
+        return [tuple(result) for result in results]
+
+def rename_with_metadata(path, meta, is_book, settings, log_widget, root, hashes=None):
+    """Rename path from meta; returns the file's final path, or None when it was left alone."""
+    if is_book and not (meta.get('title') or '').strip():
+        append_log(root, log_widget, 'Skipped (book title not found)\n')
+        return
+    if _metadata_all_empty(meta):
+        append_log(root, log_widget, 'Skipped (empty metadata)\n')
+        return
+    new_name = build_new_filename(meta, is_book, settings)
+    dir_path = os.path.dirname(path)
+    dst = os.path.join(dir_path, new_name)
+    if os.path.abspath(path) == os.path.abspath(dst):
+        append_log(root, log_widget, 'Skipped (same name)\n')
+        return path
+    if os.path.exists(dst):
+        if _same_file(path, dst, hashes):
+            append_log(root, log_widget, 'Duplicate content detected; skipped rename\n')
+            return
+        base, ext = os.path.splitext(new_name)
+        short = _cached_hash(path, hashes)[:8]
+        counter = 1
+        while True:
+            suffix = f' [{short}]' if counter == 1 else f' [{short}-{counter}]'
+            candidate = f'{base}{suffix}{ext}'
+            candidate_dst = os.path.join(dir_path, candidate)
+            if not os.path.exists(candidate_dst):
+                dst = candidate_dst
+                break
+            if _same_file(path, candidate_dst, hashes):
+                append_log(root, log_widget, 'Duplicate content detected; skipped rename\n')
+                return
+            counter += 1
+    append_log(root, log_widget, f'Input: {os.path.basename(path)}\n')
+    os.replace(path, dst)
+    if hashes is not None:
+        hashes.moved(path, dst)
+    append_log(root, log_widget, f'Output: {os.path.basename(dst)}\n')
+    return dst
+
+def _prefetch(items, maxsize: int = SCAN_QUEUE_SIZE):
+    """
+    Iterate items on a producer thread, handing them over through a bounded queue. An error
+    raised while producing is re-raised here, in the consumer; Abort ends both sides.
+    """
+    handoff = queue.Queue(maxsize)
+    end = object()
+    failure = []
+
+    def hand_over(item) -> bool:
+        # Blocking put that only gives up on Abort, so the end marker is never dropped
+        while True:
+            try:
+                handoff.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if stop_event.is_set():
+                    return False
+
+    def produce():
+        try:
+            for item in items:
+                if stop_event.is_set() or not hand_over(item):
+                    return
+        except Exception as e:
+            failure.append(e)
+        hand_over(end)
+
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        try:
+            item = handoff.get(timeout=0.1)
+        except queue.Empty:
+            if stop_event.is_set():
+                return
+            continue
+        if item is end:
+            if failure:
+                raise failure[0]
+            return
+        yield item
+
+def _stat(item) -> os.stat_result:
+    """stat a path, or reuse the result a DirEntry from iter_pdfs has cached."""
+    if isinstance(item, os.DirEntry):
+        return item.stat(follow_symlinks=False)
+    return os.stat(item)
+
+def _file_size(item) -> int:
+    try:
+        return _stat(item).st_size
+    except OSError:
+        return 0
+
+def _largest_first(paths, window: int = SUBMIT_WINDOW_FILES):
+    """
+    Reorder paths largest first within consecutive windows, so slow extractions start early and
+    small files fill the gaps at the end; a folder scan still streams window by window.
+    """
+    it = iter(paths)
+    while block := list(itertools.islice(it, window)):
+        block.sort(key=_file_size, reverse=True)
+        yield from block
+
+def _batched(items, size: int):
+    it = iter(items)
+    while batch := list(itertools.islice(it, size)):
+        yield batch
+
+def _warm_up(settings: Settings):
+    """
+    Start the extraction processes and open the Gemini connection (TLS, HTTP/2) while the
+    first batch is still being gathered, instead of on the first file's critical path.
+    """
+    pool = _extraction_pool
+    try:
+        if pool is not None:
+            pool.submit(os.getpid)
+    except RuntimeError:
+        pass
+    try:
+        get_client().models.get(model=settings.model)
+    except Exception as e:
+        logging.info(f"Connection warm-up failed: {e}")
+
+def abort_run():
+    """
+    Stop the running batch now rather than after the work already in flight: cancel queued
+    batches, kill running extractions and drop open connections (Tk thread).
+    """
+    stop_event.set()
+    executor = current_executor
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+    terminate_extraction_pool()
+    close_client()
+
 def process_list(file_list, pages, is_book, log_widget, progress_bar, root):
-    global client
-    if not API_KEY:
+    """Process file_list, which may be a lazy iterable such as iter_pdfs(folder)."""
+    global current_executor
+    settings = SETTINGS  # one consistent snapshot for the whole run
+    if not settings.api_key:
         show_error(root, 'Error', 'Gemini API key is required.')
         return
-    client = genai.Client(api_key=API_KEY)
+    get_client()
     clear_log(root, log_widget)
     stop_event.clear()
-    total = len(file_list)
-    set_progress(root, progress_bar, value=0, maximum=total)
-    for idx, path in enumerate(file_list, 1):
-        if stop_event.is_set():
-            append_log(root, log_widget, 'Aborted by user.\n')
-            break
-        append_log(root, log_widget, f'Processing ({idx}/{total}): {path}\n')
-        try:
-            if filename_already_formatted(path, is_book):
-                append_log(root, log_widget, 'Already formatted—skipped\n')
-                continue
-            snippet = extract_first_n_pages(path, pages)
-            meta = get_metadata_from_snippet(snippet, is_book)
-            if is_book and not (meta.get('title') or '').strip():
-                append_log(root, log_widget, 'Skipped (book title not found)\n')
-                continue
-            if _metadata_all_empty(meta):
-                append_log(root, log_widget, 'Skipped (empty metadata)\n')
-                continue
-            new_name = build_new_filename(meta, is_book)
-            dir_path = os.path.dirname(path)
-            dst = os.path.join(dir_path, new_name)
-            if os.path.abspath(path) == os.path.abspath(dst):
-                append_log(root, log_widget, 'Skipped (same name)\n')
-                continue
-            if os.path.exists(dst):
-                if _same_file(path, dst):
-                    append_log(root, log_widget, 'Duplicate content detected; skipped rename\n')
-                    continue
-                base, ext = os.path.splitext(new_name)
-                short = _sha1_hex(path)[:8]
-                counter = 1
-                while True:
-                    suffix = f' [{short}]' if counter == 1 else f' [{short}-{counter}]'
-                    candidate = f'{base}{suffix}{ext}'
-                    candidate_dst = os.path.join(dir_path, candidate)
-                    if not os.path.exists(candidate_dst):
-                        dst = candidate_dst
-                        break
-                    if _same_file(path, candidate_dst):
-                        append_log(root, log_widget, 'Duplicate content detected; skipped rename\n')
-                        dst = None
+    set_progress(root, progress_bar, value=0)
+    signature = _naming_signature(settings, is_book)
+    try:
+        manifest = ProcessedManifest(PROCESSED_DB_PATH)
+    except sqlite3.Error as e:
+        logging.warning(f"Processed-files manifest unavailable, processing everything: {e}")
+        manifest = None
+    if manifest is not None:
+        unprocessed = manifest.unprocessed(file_list, signature)
+        file_list = list(unprocessed) if isinstance(file_list, (list, tuple)) else unprocessed
+    known_total = None  # set for file lists; folder scans only learn their size as they go
+    if isinstance(file_list, (list, tuple)):
+        paths = sorted(file_list, key=_file_size, reverse=True)
+        known_total = len(file_list)
+        set_progress(root, progress_bar, maximum=known_total)
+    else:
+        # Folder scan, manifest filter and size sort run on their own thread; workers get plain paths
+        paths = _prefetch(map(os.fspath, _largest_first(file_list)))
+    total = idx = 0
+    try:
+        hashes = HashCache(HASH_CACHE_PATH)
+    except sqlite3.Error as e:
+        logging.warning(f"Hash cache unavailable, hashing without it: {e}")
+        hashes = None
+    parallel = settings.async_concurrency if settings.async_requests else settings.max_workers
+    start_extraction_pool(parallel * settings.batch_size)  # no more files are ever extracted at once
+    threading.Thread(target=_warm_up, args=(settings,), daemon=True).start()
+    try:
+        # Workers fetch metadata concurrently; renames stay on this thread so the
+        # exists/replace collision checks never race each other.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=settings.max_workers) as executor:
+            current_executor = executor
+            if settings.async_requests:
+                loop, limit = get_async_loop(), asyncio.Semaphore(settings.async_concurrency)
+                def submit(batch):
+                    coro = _prepare_batch_async(batch, pages, is_book, settings, limit)
+                    return asyncio.run_coroutine_threadsafe(coro, loop)
+            else:
+                def submit(batch):
+                    return executor.submit(_prepare_batch, batch, pages, is_book, settings)
+            batches = _batched(paths, settings.batch_size)
+            in_flight = {}  # future -> number of files in its batch
+            # Files submitted but not yet renamed are capped, so memory stays flat however
+            # large the folder is; the cap still leaves a queued batch for every worker.
+            window = max(SUBMIT_WINDOW_FILES, 2 * parallel * settings.batch_size)
+            scanning = True
+            while True:
+                while scanning and sum(in_flight.values()) < window and not stop_event.is_set():
+                    try:
+                        batch = next(batches, None)
+                    except Exception as e:  # raised by the folder scan, re-raised by _prefetch
+                        append_log(root, log_widget, f'Error: folder scan stopped: {e}\n')
+                        batch = None
+                    if batch is None:
+                        scanning = False
                         break
-                    counter += 1
-                if dst is None:
-                    continue
-            append_log(root, log_widget, f'Input: {os.path.basename(path)}\n')
-            os.replace(path, dst)
-            append_log(root, log_widget, f'Output: {os.path.basename(dst)}\n')
-        except Exception as e:
-            append_log(root, log_widget, f'Error: {e}\n')
-        finally:
-            set_progress(root, progress_bar, value=idx)
+                    total += len(batch)
+                    if known_total is None:
+                        set_progress(root, progress_bar, maximum=total)
+                    try:
+                        in_flight[submit(batch)] = len(batch)
+                    except RuntimeError:  # Abort shut the executor down between the check and submit
+                        if not stop_event.is_set():
+                            raise
+                if stop_event.is_set():
+                    for pending in in_flight:
+                        pending.cancel()
+                    append_log(root, log_widget, 'Aborted by user.\n')
+                    break
+                if not in_flight:
+                    break
+                done, _ = concurrent.futures.wait(
+                    in_flight, timeout=ABORT_POLL_S, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                if stop_event.is_set():
+                    continue  # no renames after Abort; the check above cancels and stops
+                for future in done:
+                    del in_flight[future]
+                    try:
+                        prepared = future.result()
+                    except Exception as e:
+                        append_log(root, log_widget, f'Error: {e}\n')
+                        continue
+                    for path, meta, note in prepared:
+                        idx += 1
+                        if known_total is not None:
+                            count = f'{idx}/{known_total}'
+                        else:
+                            count = f'{idx}/{total}+' if scanning else f'{idx}/{total}'
+                        append_log(root, log_widget, f'Processing ({count}): {path}\n')
+                        try:
+                            if note:
+                                append_log(root, log_widget, note + '\n')
+                                final_path = path if note == ALREADY_FORMATTED_NOTE else None
+                            else:
+                                final_path = rename_with_metadata(path, meta, is_book, settings, log_widget, root, hashes)
+                            if final_path and manifest is not None:
+                                manifest.record(final_path, signature)
+                        except Exception as e:
+                            append_log(root, log_widget, f'Error: {e}\n')
+                        finally:
+                            set_progress(root, progress_bar, value=idx)
+            skipped = manifest.skipped if manifest is not None else 0
+            if skipped:
+                append_log(root, log_widget, f'Skipped {skipped} file(s) unchanged since an earlier run.\n')
+            if not total and not skipped and not stop_event.is_set():
+                append_log(root, log_widget, 'No PDF files found.\n')
+                show_info(root, 'Info', 'No PDF files found.')
+    finally:
+        current_executor = None
+        shutdown_extraction_pool()
+        if hashes is not None:
+            hashes.close()
+        if manifest is not None:
+            manifest.close()
     if not stop_event.is_set():
         append_log(root, log_widget, 'Done!\n')
     set_progress(root, progress_bar, stop=True)
@@ -834,38 +1824,30 @@ def process_list(file_list, pages, is_book, log_widget, progress_bar, root):
 # =========================
 # Main GUI
 # =========================
+_RE_ASCII_DIGITS = re.compile(r'[0-9]*')
+
 def main():
-    global API_KEY, selected_files, files_entry, folder_entry
+    global selected_files, files_entry, folder_entry
     selected_files = []
     root = tk.Tk()
     root.title(f"{APP_NAME} {APP_VERSION}")
 
-    # --- App/window icon (cross-platform) ---
-    try:
-        icon_png = resource_path("assets/icon.png")
-        if os.path.exists(icon_png):
-            # keep reference to avoid garbage collection
-            root._icon_image = PhotoImage(file=icon_png)
-            root.wm_iconphoto(True, root._icon_image)
-    except Exception:
-        ico_path = resource_path("assets/icon.ico")
-        if os.path.exists(ico_path):
-            try:
-                root.iconbitmap(ico_path)
-            except Exception:
-                pass
-    # ----------------------------------------
+    load_icon(root)
 
     menubar = tk.Menu(root)
 
-    # Config menu (Help lives here; Cheatsheet is embedded in Settings)
-    cfg = tk.Menu(menubar, tearoff=0)
-    cfg.add_command(label='Settings...', command=show_config)
-    cfg.add_separator()
-    cfg.add_command(label='Help...', command=show_help_config)
-    cfg.add_command(label='About...', command=lambda: show_about_dialog(root))
-    cfg.add_separator()
-    cfg.add_command(label=f'Version: {APP_VERSION}', state='disabled')
+    # Config menu (Help lives here; Cheatsheet is embedded in Settings).
+    # Entries are added the first time it opens, keeping them off the startup path.
+    def build_cfg_menu():
+        if cfg.index(tk.END) is not None:
+            return
+        cfg.add_command(label='Settings...', command=show_config)
+        cfg.add_separator()
+        cfg.add_command(label='Help...', command=show_help_config)
+        cfg.add_command(label='About...', command=lambda: show_about_dialog(root))
+        cfg.add_separator()
+        cfg.add_command(label=f'Version: {APP_VERSION}', state='disabled')
+    cfg = tk.Menu(menubar, tearoff=0, postcommand=build_cfg_menu)
     menubar.add_cascade(label='Config', menu=cfg)
 
 
@@ -888,15 +1870,15 @@ def main():
     tk.Button(root, text='Browse Files', command=select_files).grid(row=2, column=2, padx=5, pady=5)
 
     tk.Label(root, text='Pages to extract:').grid(row=3, column=0, sticky='e', padx=5, pady=5)
-    pge = tk.Entry(root, width=5)
-    pge.insert(0, str(DEFAULT_PAPER_PAGES))
+    pages_var = tk.StringVar(value=str(DEFAULT_PAPER_PAGES))
+    digits_only = (root.register(lambda proposed: _RE_ASCII_DIGITS.fullmatch(proposed) is not None), '%P')
+    pge = tk.Entry(root, width=5, textvariable=pages_var, validate='key', validatecommand=digits_only)
     pge.grid(row=3, column=1, sticky='w', padx=5, pady=5)
 
     # Book mode toggle updates default pages
     book_var = tk.BooleanVar(value=False)
     def on_toggle_book():
-        pge.delete(0, tk.END)
-        pge.insert(0, str(DEFAULT_BOOK_PAGES if book_var.get() else DEFAULT_PAPER_PAGES))
+        pages_var.set(str(DEFAULT_BOOK_PAGES if book_var.get() else DEFAULT_PAPER_PAGES))
     tk.Checkbutton(root, text='Book mode', variable=book_var, command=on_toggle_book).grid(row=3, column=2, padx=5, pady=5)
 
     tk.Label(root, text='Log:').grid(row=4, column=0, sticky='nw', padx=5, pady=5)
@@ -913,21 +1895,23 @@ def main():
         if not selected_files and not folder:
             messagebox.showerror('Error', 'Select files or folder.'); return
         try:
-            pages = int(pge.get().strip())
+            pages = int(pages_var.get())  # keystrokes are limited to ASCII digits; only an empty field fails
         except ValueError:
             messagebox.showerror('Error', 'Pages to extract must be a whole number.'); return
         if pages < 1 or pages > MAX_PAGES_TO_EXTRACT:
             messagebox.showerror('Error', f'Pages to extract must be between 1 and {MAX_PAGES_TO_EXTRACT}.'); return
-        items = list(selected_files) if selected_files else [
-            os.path.join(dp, f) for dp, _, fs in os.walk(folder) for f in fs if f.lower().endswith('.pdf')
-        ]
-        if not items:
-            messagebox.showinfo('Info', 'No PDF files found.'); return
+        if selected_files:
+            items = list(selected_files)
+        elif os.path.isdir(folder):
+            items = iter_pdfs(folder)  # scanned lazily on the worker thread
+        else:
+            messagebox.showerror('Error', 'Folder not found.'); return
+        is_book = book_var.get()  # Tk variables are read here, never from the worker thread
         start_btn.config(state='disabled'); abort_btn.config(state='normal')
 
         def run_worker():
             try:
-                process_list(items, pages, book_var.get(), logw, prog, root)
+                process_list(items, pages, is_book, logw, prog, root)
             finally:
                 run_on_ui(root, lambda: (
                     start_btn.config(state='normal'),
@@ -937,7 +1921,7 @@ def main():
         threading.Thread(target=run_worker, daemon=True).start()
 
     def on_abort():
-        stop_event.set()
+        abort_run()
 
     start_btn = tk.Button(root, text='Start', command=on_start)
     start_btn.grid(row=6, column=1, sticky='w', padx=5, pady=10)
@@ -947,6 +1931,8 @@ def main():
 
     tk.Button(root, text='Exit', command=root.destroy).grid(row=6, column=3, sticky='e', padx=5, pady=10)
 
+    root.after(LOG_FLUSH_MS, drain_log, root)
+
     # First-run setup guide appears if no config exists
     if FIRST_RUN:
         root.after(200, lambda: show_setup_guide(root))
@@ -957,5 +1943,6 @@ def main():
 # Entrypoint
 # =========================
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # extraction pool children in PyInstaller builds
     logging.basicConfig(level=logging.INFO)
     main()